@@ -1,10 +1,8 @@
 import streamlit as st
 import requests
-import json
+from requests.adapters import HTTPAdapter, Retry
+import orjson
 import pandas as pd
-import re
-import os
-import uuid
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -16,8 +14,9 @@ st.set_page_config(
 # --- Custom CSS for Styling ---
 # WARNING: Targeting Streamlit's internal class names (like .st-emotion-cache-*) is brittle
 # and may break with future Streamlit updates.
-st.markdown(
-    """
+@st.cache_resource
+def get_page_css():
+    return """
     <style>
     .big-font {
         font-size:30px !important;
@@ -46,9 +45,9 @@ st.markdown(
         background-color: #fafafa;
     }
     </style>
-    """,
-    unsafe_allow_html=True
-)
+    """
+
+st.markdown(get_page_css(), unsafe_allow_html=True)
 
 # --- Initialize session state variables ---
 if 'processing' not in st.session_state:
@@ -66,6 +65,64 @@ page = st.sidebar.radio(
 st.sidebar.markdown("---")
 st.sidebar.info("This project leverages Generative AI to automate loan document processing, including a human-in-the-loop verification workflow.")
 
+# --- Shared HTTP session ---
+@st.cache_resource
+def get_http_session():
+    """One pooled HTTP session for the whole app.
+
+    Reuses TCP connections to the backend across reruns instead of paying
+    connection setup on every call, and retries transient failures.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=16,
+        max_retries=Retry(total=2, backoff_factor=0.1)
+    )
+    session.mount('http://', adapter)
+    return session
+
+# (connect, read) timeouts: never hang a rerun on the default infinite timeout.
+DEFAULT_TIMEOUT = (3.05, 30)
+PROCESSING_TIMEOUT = (3.05, 600)  # LLM processing of a full application is slow
+
+# The LLM's field vocabulary is fixed by the prompt, so normalize the known
+# names once at import; unseen keys fall back to computing it.
+FIELD_NAME_MAP = {name: name.replace(' ', '_').lower() for name in (
+    "Applicant Name", "Gross Income", "Net Pay", "Total Taxes", "Pay Period End Date",
+    "Total Income", "Taxes Paid", "Assessment Year", "Name", "Father's Name",
+    "Date of Birth", "Address", "Gender", "Aadhaar Number", "PAN Number", "DL No"
+)}
+
+def normalize_field_name(name):
+    return FIELD_NAME_MAP.get(name) or name.replace(' ', '_').lower()
+
+# --- Cached loader for the Reporting Dashboard ---
+@st.cache_data(ttl=60, show_spinner=False)
+def load_report_records():
+    """Fetch and flatten the verified documents from the backend.
+
+    Cached so sidebar clicks and widget interactions don't re-hit the
+    backend and re-flatten every record on each script rerun.
+    """
+    response = get_http_session().get("http://127.0.0.1:8000/get-report-data/", stream=True, timeout=DEFAULT_TIMEOUT)
+    response.raise_for_status()
+    # Build each flat record as a single dict literal (one C-level dict build
+    # per document) instead of growing it key-by-key with __setitem__.
+    return [
+        {
+            "is_active": item.get("is_active"),
+            "application_id": item["application_id"],
+            "filename": item["filename"],
+            **{f"ai_{normalize_field_name(key)}": (val.get("value") if isinstance(val, dict) else val)
+               for key, val in item.get("ai_data", {}).items()},
+            **{f"verified_{normalize_field_name(key)}": val
+               for key, val in item.get("verified_data", {}).items()},
+        }
+        # The backend streams NDJSON: one document per line.
+        for item in (orjson.loads(line) for line in response.iter_lines() if line)
+    ]
+
 # --- Helper function for the verification form ---
 def display_verification_form(doc_data, application_id, unique_key):
     extracted_data = doc_data.get("extracted_data", {})
@@ -76,23 +133,34 @@ def display_verification_form(doc_data, application_id, unique_key):
         return
 
     with st.form(key=f"verification_form_{unique_key}"):
-        corrected_data = {}
-        for field, details in extracted_data.items():
-            value = details.get('value', '') if isinstance(details, dict) else details
-            confidence = details.get('confidence', 0.0) * 100 if isinstance(details, dict) else 0.0
-
-            help_text = f"Confidence: {confidence:.1f}%"
-            if confidence < 75:
-                help_text = f"⚠️ Low Confidence ({confidence:.1f}%) - Please verify carefully."
-
-            corrected_data[field] = st.text_input(
-                label=f"{field}",
-                value=value,
-                key=f"{unique_key}_{field.lower().replace(' ', '_')}",
-                help=help_text
-            )
+        # One editable grid instead of one st.text_input widget per field —
+        # a single frontend component regardless of how many fields the AI
+        # extracted, with confidence shown as a native progress column.
+        edit_df = pd.DataFrame([
+            {
+                "Field": field,
+                "Value": details.get('value', '') if isinstance(details, dict) else details,
+                "Confidence": details.get('confidence', 0.0) * 100 if isinstance(details, dict) else 0.0
+            }
+            for field, details in extracted_data.items()
+        ])
+
+        st.caption("⚠️ Double-check any field with confidence below 75%.")
+        edited_df = st.data_editor(
+            edit_df,
+            column_config={
+                "Confidence": st.column_config.ProgressColumn(
+                    "Confidence", format="%.1f%%", min_value=0, max_value=100
+                )
+            },
+            disabled=["Field", "Confidence"],
+            hide_index=True,
+            use_container_width=True,
+            key=f"editor_{unique_key}"
+        )
 
         submitted = st.form_submit_button("Approve & Save This Document's Data")
+        corrected_data = dict(zip(edited_df["Field"], edited_df["Value"].astype(str)))
 
         if submitted:
             with st.spinner("Saving verified data..."):
@@ -103,14 +171,40 @@ def display_verification_form(doc_data, application_id, unique_key):
                     "verified_data": corrected_data
                 }
                 try:
-                    save_response = requests.post("http://127.0.0.1:8000/save-verified-document/", json=payload)
+                    save_response = get_http_session().post("http://127.0.0.1:8000/save-verified-document/", json=payload, timeout=DEFAULT_TIMEOUT)
                     if save_response.status_code == 200:
+                        load_report_records.clear()  # dashboard must see the new record
                         st.success(f"✅ Verified data for `{filename}` saved successfully!")
                     else:
                         st.error(f"Failed to save data for `{filename}`: {save_response.text}")
                 except requests.exceptions.ConnectionError:
                     st.error("🚫 Connection Error: Could not connect to the backend to save data.")
 
+# --- Per-document verification section ---
+@st.fragment
+def render_document_result(doc_result, application_id, index):
+    """Render one document's verification expander as its own fragment so a
+    form submission or toggle here reruns only this section, not the other
+    N-1 documents and the summary report."""
+    doc_type = doc_result.get('document_type', 'Unknown')
+    filename = doc_result.get('filename', 'N/A')
+
+    with st.expander(f"**{doc_type}**: `{filename}`"):
+        col1_doc, col2_doc = st.columns(2)
+        with col1_doc:
+            display_verification_form(doc_result, application_id, unique_key=f"doc_{index}")
+        with col2_doc:
+            st.markdown("##### AI Analysis")
+            analysis = doc_result.get('analysis', {})
+            if analysis:
+                st.json(analysis)
+            else:
+                st.write("No analysis provided.")
+
+        # --- FIX: Replaced nested expander with a toggle ---
+        if st.toggle("View Full Raw Data (for debugging)", key=f"raw_data_toggle_{index}"):
+            st.json(doc_result)
+
 # --- Page 1: Loan Application Processor ---
 if page == "Loan Application Processor":
     st.title("🏦 Intelligent Loan Application Processor")
@@ -143,16 +237,20 @@ if page == "Loan Application Processor":
             st.session_state.processing = True
             st.info(f"✨ Processing {len(uploaded_files)} documents...")
             with st.spinner('AI is analyzing the application... This may take some time.'):
-                multipart_files = [('files', (file.name, file.getvalue(), file.type)) for file in uploaded_files]
+                # Pass the file-like UploadedFile objects directly so requests streams
+                # them into the multipart body instead of duplicating each file in RAM.
+                for file in uploaded_files:
+                    file.seek(0)
+                multipart_files = [('files', (file.name, file, file.type)) for file in uploaded_files]
                 try:
-                    response = requests.post("http://127.0.0.1:8000/process-application/", files=multipart_files)
+                    response = get_http_session().post("http://127.0.0.1:8000/process-application/", files=multipart_files, timeout=PROCESSING_TIMEOUT)
                     if response.status_code == 200:
                         st.success('✅ Application processed successfully!')
-                        st.session_state.application_results = response.json()
+                        st.session_state.application_results = orjson.loads(response.content)
                     else:
                         try:
-                            error_detail = response.json().get('detail', response.text)
-                        except json.JSONDecodeError:
+                            error_detail = orjson.loads(response.content).get('detail', response.text)
+                        except orjson.JSONDecodeError:
                             error_detail = response.text
                         st.error(f"❌ Error from server ({response.status_code}): {error_detail}")
                         st.session_state.application_results = None
@@ -205,32 +303,17 @@ if page == "Loan Application Processor":
                 st.write("None identified.")
 
         with st.expander("View Initial Cross-Validation Check"):
-            cross_val_report = results.get('cross_validation_report', {})
-            st.json(cross_val_report)
+            # Only serialize the report to the frontend once actually requested;
+            # a collapsed expander still ships its children on every rerun.
+            if st.toggle("Show cross-validation report", key="cross_val_toggle"):
+                st.json(results.get('cross_validation_report', {}))
 
         st.markdown("---")
         st.subheader("📄 Individual Document Verification")
         st.info("Review each document below. You can correct the data and save it individually.")
 
         for i, doc_result in enumerate(results.get('individual_document_results', [])):
-            doc_type = doc_result.get('document_type', 'Unknown')
-            filename = doc_result.get('filename', 'N/A')
-
-            with st.expander(f"**{doc_type}**: `{filename}`"):
-                col1_doc, col2_doc = st.columns(2)
-                with col1_doc:
-                    display_verification_form(doc_result, application_id, unique_key=f"doc_{i}")
-                with col2_doc:
-                    st.markdown("##### AI Analysis")
-                    analysis = doc_result.get('analysis', {})
-                    if analysis:
-                        st.json(analysis)
-                    else:
-                        st.write("No analysis provided.")
-
-                # --- FIX: Replaced nested expander with a checkbox ---
-                if st.checkbox("View Full Raw Data (for debugging)", key=f"raw_data_checkbox_{i}"):
-                    st.json(doc_result)
+            render_document_result(doc_result, application_id, i)
 
 # --- Page 2: Reporting Dashboard (Refactored for MongoDB) ---
 elif page == "Reporting Dashboard":
@@ -238,89 +321,85 @@ elif page == "Reporting Dashboard":
     st.markdown("---")
 
     try:
-        # Fetches data from the new MongoDB endpoint
-        response = requests.get("http://127.0.0.1:8000/get-report-data/")
-        if response.status_code == 200:
-            data = response.json()
-            if data:
-                records = []
-                for item in data:
-                    # --- CHANGE: Add 'is_active' status to the record ---
-                    flat_record = {
-                        "is_active": item.get("is_active"),
-                        "application_id": item["application_id"],
-                        "filename": item["filename"]
-                    }
-
-                    # Safely access ai_data and verified_data
-                    for key, val in item.get("ai_data", {}).items():
-                        flat_record[f"ai_{key.replace(' ', '_').lower()}"] = val.get("value") if isinstance(val, dict) else val
-                    for key, val in item.get("verified_data", {}).items():
-                        flat_record[f"verified_{key.replace(' ', '_').lower()}"] = val
-                    records.append(flat_record)
-
-                df = pd.DataFrame(records)
-                
-                # --- CHANGE: Only calculate metrics on active documents ---
-                active_df = df[df['is_active'] == True]
-
-                st.subheader("Key Performance Indicators (Based on Active Documents)")
-                total_fields, matching_fields = 0, 0
-                
-                verified_cols = [col for col in active_df.columns if col.startswith('verified_')]
-                fields_to_check = [col.replace('verified_', '') for col in verified_cols]
-
-                for field in fields_to_check:
-                    ai_col, verified_col = f"ai_{field}", f"verified_{field}"
-                    if ai_col in active_df.columns and verified_col in active_df.columns:
-                        df_subset = active_df.dropna(subset=[ai_col, verified_col]).copy()
-                        
-                        # --- FIX: Explicitly convert columns to string before comparison ---
-                        df_subset[ai_col] = df_subset[ai_col].astype(str)
-                        df_subset[verified_col] = df_subset[verified_col].astype(str)
-
-                        comparison = df_subset[ai_col].str.strip().str.lower() == df_subset[verified_col].str.strip().str.lower()
-                        matching_fields += comparison.sum()
-                        total_fields += len(df_subset)
-
-                ai_accuracy = (matching_fields / total_fields) * 100 if total_fields > 0 else 0
-                total_docs = len(active_df)
-
-                avg_income_col = next((col for col in ['verified_gross_income', 'verified_total_income'] if col in active_df.columns), None)
-                avg_income = pd.to_numeric(active_df[avg_income_col], errors='coerce').mean() if avg_income_col else None
-                
-                avg_taxes_col = next((col for col in ['verified_total_taxes', 'verified_taxes_paid'] if col in active_df.columns), None)
-                avg_taxes = pd.to_numeric(active_df[avg_taxes_col], errors='coerce').mean() if avg_taxes_col else None
-
-                col1, col2, col3, col4 = st.columns(4)
-                col1.metric("Total Active Docs", f"{total_docs}")
-                col2.metric("Avg. Gross Income", f"₹{avg_income:,.2f}" if avg_income else "N/A")
-                col3.metric("Avg. Total Taxes", f"₹{avg_taxes:,.2f}" if avg_taxes else "N/A")
-                col4.metric("AI Accuracy", f"{ai_accuracy:.2f}%")
-
-                st.markdown("---")
-                st.subheader("Complete Data History")
-                st.info("This table shows all verified documents, including older, inactive versions.")
-                st.dataframe(df)
-
-                st.markdown("---")
-                st.subheader("Manage Data")
-                if st.checkbox("I want to permanently delete all verified data."):
-                    if st.button("Delete All Data", type="primary", help="This action cannot be undone."):
-                        try:
-                            # Calls the correct delete endpoint
-                            delete_response = requests.delete("http://127.0.0.1:8000/delete-all-data/")
-                            if delete_response.status_code == 200:
-                                st.success("All verified data has been deleted successfully.")
-                                st.rerun()
-                            else:
-                                st.error(f"Failed to delete data: {delete_response.text}")
-                        except requests.exceptions.ConnectionError:
-                            st.error("🚫 Connection Error.")
-            else:
-                st.warning("No verified data found in the database.")
+        # Fetches data from the new MongoDB endpoint (cached across reruns)
+        records = load_report_records()
+        if records:
+            df = pd.DataFrame(records)
+
+            # --- CHANGE: Only calculate metrics on active documents ---
+            active_df = df[df['is_active'] == True]
+
+            st.subheader("Key Performance Indicators (Based on Active Documents)")
+            total_fields, matching_fields = 0, 0
+
+            # One pass over the columns with O(1) set membership, instead of an
+            # O(n) Index scan per candidate ai_ column.
+            columns = set(active_df.columns)
+            pairs = [
+                ('ai_' + col[len('verified_'):], col)
+                for col in active_df.columns
+                if col.startswith('verified_') and 'ai_' + col[len('verified_'):] in columns
+            ]
+
+            # Compare all ai_*/verified_* pairs in one vectorized pass instead
+            # of one pandas round-trip per column. Cells where either side is
+            # missing are excluded, matching the old per-column dropna.
+            if pairs:
+                ai_df = active_df[[ai_col for ai_col, _ in pairs]]
+                verified_df = active_df[[verified_col for _, verified_col in pairs]]
+                both_present = ai_df.notna().values & verified_df.notna().values
+
+                normalize = lambda frame: frame.astype(str).apply(lambda s: s.str.strip().str.lower()).values
+                comparison = (normalize(ai_df) == normalize(verified_df)) & both_present
+                matching_fields = int(comparison.sum())
+                total_fields = int(both_present.sum())
+
+            ai_accuracy = (matching_fields / total_fields) * 100 if total_fields > 0 else 0
+            total_docs = len(active_df)
+
+            # Coerce all financial columns in one pass rather than one
+            # pd.to_numeric call per metric.
+            metric_cols = [col for col in ('verified_gross_income', 'verified_total_income',
+                                           'verified_total_taxes', 'verified_taxes_paid')
+                           if col in active_df.columns]
+            metric_means = active_df[metric_cols].apply(pd.to_numeric, errors='coerce').mean() if metric_cols else {}
+
+            avg_income_col = next((col for col in ['verified_gross_income', 'verified_total_income'] if col in metric_means), None)
+            avg_income = metric_means[avg_income_col] if avg_income_col else None
+
+            avg_taxes_col = next((col for col in ['verified_total_taxes', 'verified_taxes_paid'] if col in metric_means), None)
+            avg_taxes = metric_means[avg_taxes_col] if avg_taxes_col else None
+
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Total Active Docs", f"{total_docs}")
+            col2.metric("Avg. Gross Income", f"₹{avg_income:,.2f}" if avg_income else "N/A")
+            col3.metric("Avg. Total Taxes", f"₹{avg_taxes:,.2f}" if avg_taxes else "N/A")
+            col4.metric("AI Accuracy", f"{ai_accuracy:.2f}%")
+
+            st.markdown("---")
+            st.subheader("Complete Data History")
+            st.info("This table shows all verified documents, including older, inactive versions.")
+            st.dataframe(df)
+
+            st.markdown("---")
+            st.subheader("Manage Data")
+            if st.checkbox("I want to permanently delete all verified data."):
+                if st.button("Delete All Data", type="primary", help="This action cannot be undone."):
+                    try:
+                        # Calls the correct delete endpoint
+                        delete_response = get_http_session().delete("http://127.0.0.1:8000/delete-all-data/", timeout=DEFAULT_TIMEOUT)
+                        if delete_response.status_code == 200:
+                            load_report_records.clear()
+                            st.success("All verified data has been deleted successfully.")
+                            st.rerun()
+                        else:
+                            st.error(f"Failed to delete data: {delete_response.text}")
+                    except requests.exceptions.ConnectionError:
+                        st.error("🚫 Connection Error.")
         else:
-            st.error(f"Failed to fetch report data from the backend: {response.text}")
+            st.warning("No verified data found in the database.")
+    except requests.exceptions.HTTPError as e:
+        st.error(f"Failed to fetch report data from the backend: {e.response.text}")
     except requests.exceptions.ConnectionError:
         st.error("🚫 Connection Error: Could not connect to the backend.")
     except Exception as e:
@@ -1,90 +1,110 @@
 import os
 import io
-import json
+import orjson
 import base64
-import re
 import uuid
+import asyncio
+import tempfile
+import hashlib
 from datetime import datetime, timezone
 from pydantic import BaseModel
 from typing import Dict, Any, List
-from PIL import Image
+from PIL import Image, ImageOps
 from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage
+from langchain_core.globals import set_llm_cache
+from langchain_community.cache import SQLiteCache
 from dotenv import load_dotenv
 from pdf2image import convert_from_bytes
 # --- NEW: MongoDB Dependencies ---
 import motor.motor_asyncio
+from pymongo import InsertOne, UpdateMany
 from bson import ObjectId
 
 load_dotenv()
-app = FastAPI(title="Intelligent Document Processor API")
+app = FastAPI(title="Intelligent Document Processor API", default_response_class=ORJSONResponse)
 
 # --- NEW: MongoDB Connection ---
 MONGO_DETAILS = os.getenv("MONGO_DETAILS")
 if not MONGO_DETAILS:
     raise ValueError("MONGO_DETAILS environment variable not set!")
 
-client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_DETAILS)
+# One client for the process lifetime. Pool sizing matters now that saves can
+# arrive concurrently with gathered processing; zstd compression shrinks the
+# report payloads coming back from Atlas; the short server-selection timeout
+# fails fast instead of hanging requests when Atlas is unreachable.
+client = motor.motor_asyncio.AsyncIOMotorClient(
+    MONGO_DETAILS,
+    maxPoolSize=50,
+    minPoolSize=5,
+    serverSelectionTimeoutMS=3000,
+    compressors="zstd"
+)
 
 db = client.loan_processing
 verified_collection = db.get_collection("verified_documents")
 
-llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash-latest", temperature=0)
+@app.on_event("startup")
+async def create_indexes():
+    # Every save filters on this exact compound key to deactivate the previous
+    # version; without the index that's a collection scan that grows with the
+    # audit history. create_index is a no-op once the index exists.
+    await verified_collection.create_index([("application_id", 1), ("filename", 1), ("is_active", 1)])
+    # The reporting endpoint filters on is_active alone.
+    await verified_collection.create_index([("is_active", 1)])
+
+# response_mime_type constrains Gemini's decoder to emit valid JSON, so the
+# model can't burn output tokens on prose or markdown fences around it.
+llm = ChatGoogleGenerativeAI(
+    model="gemini-1.5-flash-latest",
+    temperature=0,
+    response_mime_type="application/json",
+)
+
+# With temperature=0 every Gemini call is deterministic for a given prompt
+# (including the base64-encoded images), so cache responses on disk: retries
+# and repeated cross-validation/summary inputs skip the round-trip entirely,
+# and the cache survives restarts unlike the in-process document cache.
+set_llm_cache(SQLiteCache(database_path=".langchain_cache.db"))
 
 # --- PROMPT ENGINEERING UPGRADE ---
 
-# 1. More specific classification options
-classification_prompt_template = """
-You are an expert document classifier. Your task is to analyze the provided document image and identify its type.
-Respond with only one of the following categories: 'Payslip', 'Tax Form', 'PAN Card', 'Aadhaar Card', 'Driving License', 'Bank Statement', 'Form 16', 'ITR', or 'Other'.
-Do not add any other text or explanation.
-"""
+# Classification and extraction used to be two Gemini round-trips per document;
+# a single unified prompt does both in one call, halving per-document LLM
+# latency and amortizing the prompt preamble across the whole task.
+unified_prompt = """
+You are an expert AI assistant for loan document processing. Analyze the provided document image(s) and do both of the following:
 
-# 2. More detailed extraction prompts for each document type
-extraction_prompts = {
-    "Payslip": """
-    You are an expert AI assistant. From the provided payslip image, extract: "Applicant Name", "Gross Income", "Net Pay", "Total Taxes", and "Pay Period End Date".
-    For each field, provide the 'value' and a 'confidence' score.
-    Provide your response as a single, valid JSON object with keys "extracted_data" and "analysis".
-    """,
-    "Tax Form": """
-    You are an expert AI assistant. From the provided tax form image, extract: "Applicant Name", "Total Income", "Taxes Paid", and "Assessment Year".
-    For each field, provide the 'value' and a 'confidence' score.
-    Provide your response as a single, valid JSON object with keys "extracted_data" and "analysis".
-    """,
-    "PAN Card": """
-    You are an expert AI assistant. From the provided PAN Card image, extract: "Name", "Father's Name", "Date of Birth", and "PAN Number".
-    For each field, provide the 'value' and a 'confidence' score.
-    Provide your response as a single, valid JSON object with keys "extracted_data" and "analysis".
-    """,
-    "Aadhaar Card": """
-    You are an expert AI assistant. From the provided Aadhaar Card image, extract: "Name", "Date of Birth", "Address", "Gender", and "Aadhaar Number" (the 12-digit number).
-    For each field, provide the 'value' and a 'confidence' score.
-    Provide your response as a single, valid JSON object with keys "extracted_data" and "analysis".
-    """,
-    "Driving License": """
-    You are an expert AI assistant. From the provided Driving License image, extract: "Name", "Date of Birth", "Address", and "DL No" (the license number).
-    For each field, provide the 'value' and a 'confidence' score.
-    Provide your response as a single, valid JSON object with keys "extracted_data" and "analysis".
-    """,
-    "Default": """
-    You are an expert AI assistant. From the provided document image, extract any personally identifiable information (PII) and key financial figures you can find.
-    For each field, provide the 'value' and a 'confidence' score.
-    Provide your response as a single, valid JSON object with keys "extracted_data" and "analysis".
-    """
-}
+1. Classify the document as exactly one of: 'Payslip', 'Tax Form', 'PAN Card', 'Aadhaar Card', 'Driving License', 'Bank Statement', 'Form 16', 'ITR', or 'Other'.
+2. Extract the fields for that document type:
+   - Payslip: "Applicant Name", "Gross Income", "Net Pay", "Total Taxes", and "Pay Period End Date".
+   - Tax Form: "Applicant Name", "Total Income", "Taxes Paid", and "Assessment Year".
+   - PAN Card: "Name", "Father's Name", "Date of Birth", and "PAN Number".
+   - Aadhaar Card: "Name", "Date of Birth", "Address", "Gender", and "Aadhaar Number" (the 12-digit number).
+   - Driving License: "Name", "Date of Birth", "Address", and "DL No" (the license number).
+   - Any other type: any personally identifiable information (PII) and key financial figures you can find.
+
+For each extracted field, provide the 'value' and a 'confidence' score.
+Provide your response as a single, valid JSON object with keys "document_type", "extracted_data" and "analysis".
+The final output must be ONLY the JSON object, with no extra text or markdown.
+"""
 
+# Both report prompts keep every static instruction in one immutable prefix and
+# append the variable data last, so Gemini's prompt caching can reuse the
+# repeated instruction tokens across requests.
 cross_validation_prompt = """
 You are a senior loan underwriter AI. You have been provided with extracted data from multiple documents for a single loan application.
 Your task is to perform a final cross-validation check. Analyze all the data and identify any critical inconsistencies between the documents.
 Specifically check for mismatches in "Applicant Name" and "Date of Birth".
+Provide a summary of your findings as a single, valid JSON object with two keys: "overall_summary" (a string) and "validation_passed" (a boolean).
+The final output must be ONLY the JSON object, with no extra text or markdown.
+
 Here is the data from all documents:
 ---
 {summarized_data}
 ---
-Provide a summary of your findings as a single, valid JSON object with two keys: "overall_summary" (a string) and "validation_passed" (a boolean).
-The final output must be ONLY the JSON object, with no extra text or markdown.
 """
 
 # 3. A more robust and clearer final summary prompt
@@ -98,92 +118,229 @@ Based on all the information provided below:
 3.  **Consolidate all red flags** and inconsistencies into a single list of strings.
 4.  **Provide a final recommendation**: 'Approve', 'Deny', or 'Manual Review Required'.
 
+Provide your response as a single, valid JSON object with four keys: "overall_summary", "key_financial_metrics", "consolidated_red_flags", and "final_recommendation".
+The final output must be ONLY the JSON object.
+
 Here is all the data:
 ---
 {complete_data}
 ---
-
-Provide your response as a single, valid JSON object with four keys: "overall_summary", "key_financial_metrics", "consolidated_red_flags", and "final_recommendation".
-The final output must be ONLY the JSON object.
 """
 
 
+def parse_llm_json(response_text: str) -> dict:
+    """Parse a Gemini response that should be a bare JSON object.
+
+    With JSON output mode enforced at the model level and temperature=0 the
+    responses are clean JSON essentially always, so try orjson.loads directly
+    and keep the fence-stripping and outermost-brace fallback only as a
+    safety net. Raises ValueError when nothing parseable is found.
+    """
+    cleaned = response_text.strip().removeprefix("```json").removeprefix("```").removesuffix("```").strip()
+    try:
+        return orjson.loads(cleaned)
+    except orjson.JSONDecodeError:
+        start, end = cleaned.find('{'), cleaned.rfind('}')
+        if start == -1 or end <= start:
+            raise ValueError("No JSON object found in LLM response")
+        return orjson.loads(cleaned[start:end + 1])
+
+# Phone scans routinely arrive at 12MP; Gemini tiles anything larger than
+# ~1568px per edge into extra image tokens, and document text is perfectly
+# legible at that size, so every pixel beyond it is paid for in encoding,
+# base64 payload size and tokens for no accuracy gain.
+MAX_IMAGE_EDGE = 1568
+
+def load_upload_image(file_content: bytes):
+    """Decode an uploaded photo, fix its EXIF orientation and cap resolution."""
+    image = Image.open(io.BytesIO(file_content))
+    image = ImageOps.exif_transpose(image)
+    if max(image.size) > MAX_IMAGE_EDGE:
+        image.thumbnail((MAX_IMAGE_EDGE, MAX_IMAGE_EDGE), Image.LANCZOS)
+    return image
+
+def encode_upload_image(file_content: bytes, filename: str) -> str:
+    """Base64-encode an uploaded photo, decoding it only when necessary.
+
+    Image.open reads just the header here, so probing the dimensions is
+    cheap. An upload already within the size cap is passed through as its
+    original bytes — browsers and Gemini both accept PNG/JPEG as-is, so the
+    full-resolution decode and re-encode are pure waste. Only oversized
+    photos take the decode-and-downscale path.
+    """
+    with Image.open(io.BytesIO(file_content)) as probe:
+        oversized = max(probe.size) > MAX_IMAGE_EDGE
+    if not oversized:
+        ext = 'png' if filename.endswith('.png') else 'jpeg'
+        return f"data:image/{ext};base64,{base64.b64encode(file_content).decode('utf-8')}"
+    return pil_to_base64(load_upload_image(file_content))
+
 def pil_to_base64(image):
+    # JPEG instead of lossless PNG: ~5-10x smaller payloads for scanned pages,
+    # which directly cuts encode CPU, upload time and Gemini image tokens.
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
     buffered = io.BytesIO()
-    image.save(buffered, format="PNG")
-    img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
-    return f"data:image/png;base64,{img_str}"
+    image.save(buffered, format="JPEG", quality=85, optimize=True)
+    # getbuffer() hands b64encode a memoryview over the BytesIO contents;
+    # getvalue() would copy the whole encoded image first.
+    img_str = base64.b64encode(buffered.getbuffer()).decode("utf-8")
+    return f"data:image/jpeg;base64,{img_str}"
+
+def encode_pdf_pages(file_content: bytes) -> List[str]:
+    """Rasterize a PDF and base64-encode it one page at a time.
+
+    paths_only keeps poppler's output on disk, so peak memory is a single
+    encoded page rather than every page of the document held as PIL images
+    at once; each page file is deleted as soon as it has been encoded. The
+    pages are already JPEG on disk, so they are encoded straight from the
+    file bytes with no PIL round-trip.
+    """
+    encoded_images = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        page_paths = convert_from_bytes(
+            file_content, dpi=150, fmt='jpeg',
+            thread_count=os.cpu_count() or 1,
+            output_folder=tmpdir, paths_only=True
+        )
+        for path in page_paths:
+            with open(path, 'rb') as page_file:
+                encoded_images.append(
+                    "data:image/jpeg;base64," + base64.b64encode(page_file.read()).decode("utf-8")
+                )
+            os.unlink(path)
+    return encoded_images
+
+# Processed-document cache keyed on content hash: re-uploading the same file
+# (very common while testing) skips rasterization and both Gemini calls.
+_document_cache: Dict[str, dict] = {}
+_DOCUMENT_CACHE_MAX = 256
 
 async def process_single_file(file_content: bytes, filename: str) -> dict:
-    images_to_process = []
+    # Don't spend a Gemini call on a file that can't possibly contain a document.
+    if not file_content:
+        raise HTTPException(status_code=400, detail=f"Uploaded file is empty: {filename}")
+
+    cache_key = hashlib.sha256(file_content).hexdigest()
+    cached_result = _document_cache.get(cache_key)
+    if cached_result is not None:
+        return {**cached_result, 'filename': filename}
+
+    # pdf2image (poppler) and PIL are blocking, CPU-bound calls; run them in a
+    # worker thread so the event loop stays free to serve other requests.
     if filename.endswith('.pdf'):
-        images_to_process = convert_from_bytes(file_content)
+        encoded_images = await asyncio.to_thread(encode_pdf_pages, file_content)
     elif filename.endswith(('.png', '.jpg', '.jpeg')):
-        images_to_process.append(Image.open(io.BytesIO(file_content)))
+        encoded_images = [await asyncio.to_thread(encode_upload_image, file_content, filename)]
     else:
         raise HTTPException(status_code=400, detail=f"Unsupported file type: {filename}")
 
-    if not images_to_process:
+    if not encoded_images:
          raise HTTPException(status_code=400, detail="Could not convert document to image.")
 
-    # 1. Classify
-    classification_message = HumanMessage(content=[{"type": "text", "text": classification_prompt_template}, {"type": "image_url", "image_url": pil_to_base64(images_to_process[0])}])
-    doc_type = llm.invoke([classification_message]).content.strip()
+    # Classify + extract in one Gemini call
+    content_parts = [{"type": "text", "text": unified_prompt}]
+    for encoded in encoded_images:
+        content_parts.append({"type": "image_url", "image_url": encoded})
 
-    # 2. Extract
-    extraction_prompt = extraction_prompts.get(doc_type, extraction_prompts["Default"])
-    content_parts = [{"type": "text", "text": extraction_prompt}]
-    for img in images_to_process:
-        content_parts.append({"type": "image_url", "image_url": pil_to_base64(img)})
-    
     message = HumanMessage(content=content_parts)
-    response_json_string = llm.invoke([message]).content
+    response_json_string = (await llm.ainvoke([message])).content
     
     try:
-        clean_response = response_json_string.replace("```json", "").replace("```", "").strip()
-        final_result = json.loads(clean_response)
-    except json.JSONDecodeError:
+        final_result = parse_llm_json(response_json_string)
+    except ValueError:
         raise HTTPException(status_code=500, detail=f"AI returned a non-JSON response: {response_json_string}")
 
-    # --- FIX: The document type from the AI might be different from our specific keys ---
-    # We should add the *actual* type returned by the classifier to the result
-    final_result['document_type'] = doc_type
+    # The classifier's type now arrives inside the JSON itself; make sure the
+    # key exists even if the model omitted it.
+    final_result.setdefault('document_type', 'Other')
     final_result['filename'] = filename
+
+    if len(_document_cache) >= _DOCUMENT_CACHE_MAX:
+        _document_cache.clear()  # crude bound, but keeps memory flat
+    _document_cache[cache_key] = final_result
     return final_result
 
+async def cross_validate_and_summarize(application_results: List[dict]) -> tuple:
+    """Run the cross-validation and final-summary LLM passes over the
+    per-document results. Shared by the JSON and streaming endpoints."""
+    # If extraction produced nothing at all there is no data to cross-check or
+    # summarize — skip both LLM passes and route straight to a human.
+    if not any(res.get('extracted_data') for res in application_results):
+        cross_val_json = {
+            "overall_summary": "No structured data was extracted from any document; cross-validation skipped.",
+            "validation_passed": False
+        }
+        summary_json = {
+            "overall_summary": "No structured data could be extracted from the uploaded documents, so no automated assessment is possible.",
+            "key_financial_metrics": [],
+            "consolidated_red_flags": ["No data could be extracted from any uploaded document."],
+            "final_recommendation": "Manual Review Required"
+        }
+        return cross_val_json, summary_json
+
+    summarized_data_for_ai = [{"filename": res.get('filename'), "document_type": res.get('document_type'), "data": res.get('extracted_data')} for res in application_results]
+
+    cross_val_message = HumanMessage(content=cross_validation_prompt.format(summarized_data=orjson.dumps(summarized_data_for_ai, option=orjson.OPT_INDENT_2).decode()))
+    cross_val_response_str = (await llm.ainvoke([cross_val_message])).content
+
+    try:
+        cross_val_json = parse_llm_json(cross_val_response_str)
+    except ValueError:
+        cross_val_json = {"overall_summary": "AI cross-validation returned an invalid format.", "validation_passed": False}
+
+    complete_data_for_summary = { 
+        "individual_documents": application_results,
+        "initial_cross_validation": cross_val_json
+    }
+    summary_message = HumanMessage(content=final_summary_prompt.format(complete_data=orjson.dumps(complete_data_for_summary, option=orjson.OPT_INDENT_2).decode()))
+    summary_response_str = (await llm.ainvoke([summary_message])).content
+
+    try:
+        summary_json = parse_llm_json(summary_response_str)
+    except ValueError:
+        summary_json = {"final_recommendation": "Error", "overall_summary": "AI failed to generate a final summary report."}
+
+    return cross_val_json, summary_json
+
+ALLOWED_UPLOAD_EXTENSIONS = ('.pdf', '.png', '.jpg', '.jpeg')
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+
+def validate_upload(file: UploadFile) -> None:
+    """Reject unsupported or oversized uploads before their bytes are read.
+
+    Checking filename and the multipart-reported size up front means a bad
+    upload fails in microseconds instead of after the server has buffered
+    the whole file into memory.
+    """
+    filename = (file.filename or "").lower()
+    if not filename.endswith(ALLOWED_UPLOAD_EXTENSIONS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type: {file.filename}. Allowed: PDF, PNG, JPG, JPEG."
+        )
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large: {file.filename} exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit."
+        )
+
 @app.post("/process-application/")
 async def process_application(files: List[UploadFile] = File(...)):
     try:
         application_id = str(uuid.uuid4())
-        application_results = []
         for file in files:
-            file_content = await file.read()
-            single_result = await process_single_file(file_content, file.filename.lower())
-            application_results.append(single_result)
-        
-        summarized_data_for_ai = [{"filename": res.get('filename'), "document_type": res.get('document_type'), "data": res.get('extracted_data')} for res in application_results]
-        
-        cross_val_message = HumanMessage(content=cross_validation_prompt.format(summarized_data=json.dumps(summarized_data_for_ai, indent=2)))
-        cross_val_response_str = llm.invoke([cross_val_message]).content
-        
-        try:
-            json_match = re.search(r'\{.*\}', cross_val_response_str, re.DOTALL)
-            cross_val_json = json.loads(json_match.group(0)) if json_match else {}
-        except json.JSONDecodeError:
-            cross_val_json = {"overall_summary": "AI cross-validation returned an invalid format.", "validation_passed": False}
-
-        complete_data_for_summary = { 
-            "individual_documents": application_results,
-            "initial_cross_validation": cross_val_json
-        }
-        summary_message = HumanMessage(content=final_summary_prompt.format(complete_data=json.dumps(complete_data_for_summary, indent=2)))
-        summary_response_str = llm.invoke([summary_message]).content
+            validate_upload(file)
+        # Each per-file pipeline is independent (threaded rasterization plus a
+        # Gemini round-trip), so run them concurrently: a K-document package
+        # takes ~max(T) wall-clock instead of sum(T). gather preserves order.
+        contents = await asyncio.gather(*(file.read() for file in files))
+        application_results = list(await asyncio.gather(
+            *(process_single_file(file_content, file.filename.lower())
+              for file_content, file in zip(contents, files))
+        ))
 
-        try:
-            json_match = re.search(r'\{.*\}', summary_response_str, re.DOTALL)
-            summary_json = json.loads(json_match.group(0)) if json_match else {}
-        except json.JSONDecodeError:
-            summary_json = {"final_recommendation": "Error", "overall_summary": "AI failed to generate a final summary report."}
+        cross_val_json, summary_json = await cross_validate_and_summarize(application_results)
 
         return {
             "application_id": application_id,
@@ -196,6 +353,43 @@ async def process_application(files: List[UploadFile] = File(...)):
             raise e
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred during application processing: {str(e)}")
 
+@app.post("/process-application-stream/")
+async def process_application_stream(files: List[UploadFile] = File(...)):
+    """Streaming variant of /process-application/.
+
+    Emits one SSE event per processed document, then a final 'report' event
+    with the same payload shape as the JSON endpoint, so clients can show
+    progress instead of a spinner for the whole multi-minute pipeline.
+    """
+    application_id = str(uuid.uuid4())
+    for file in files:
+        validate_upload(file)
+    # Read the uploads before the response starts; UploadFile spools are
+    # closed once the StreamingResponse begins.
+    file_payloads = [(await file.read(), file.filename.lower()) for file in files]
+
+    async def event_stream():
+        application_results = []
+        try:
+            for file_content, filename in file_payloads:
+                single_result = await process_single_file(file_content, filename)
+                application_results.append(single_result)
+                yield f"data: {orjson.dumps({'event': 'document', 'result': single_result}).decode()}\n\n"
+
+            cross_val_json, summary_json = await cross_validate_and_summarize(application_results)
+            final_payload = {
+                "application_id": application_id,
+                "individual_document_results": application_results,
+                "cross_validation_report": cross_val_json,
+                "final_summary_report": summary_json
+            }
+            yield f"data: {orjson.dumps({'event': 'report', 'result': final_payload}).decode()}\n\n"
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            yield f"data: {orjson.dumps({'event': 'error', 'detail': detail}).decode()}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 
 class VerificationPayload(BaseModel):
     application_id: str
@@ -206,36 +400,84 @@ class VerificationPayload(BaseModel):
 @app.post("/save-verified-document/")
 async def save_verified_document(payload: VerificationPayload):
     try:
-        await verified_collection.update_many(
-            {"application_id": payload.application_id, "filename": payload.filename, "is_active": True},
-            {"$set": {"is_active": False, "end_date": datetime.now(timezone.utc)}}
-        )
-        
+        now = datetime.now(timezone.utc)
         new_document_record = {
             "application_id": payload.application_id,
             "filename": payload.filename,
             "ai_data": payload.original_ai_data.get("extracted_data", {}),
             "verified_data": payload.verified_data,
-            "start_date": datetime.now(timezone.utc),
+            "start_date": now,
             "end_date": None,
             "is_active": True
         }
-        
-        result = await verified_collection.insert_one(new_document_record)
-        return {"status": "success", "message": f"Verified data for {payload.filename} saved with ID {result.inserted_id}."}
+
+        # Deactivate the previous version and insert the new one in a single
+        # ordered bulk_write — one Atlas round-trip instead of two.
+        await verified_collection.bulk_write([
+            UpdateMany(
+                {"application_id": payload.application_id, "filename": payload.filename, "is_active": True},
+                {"$set": {"is_active": False, "end_date": now}}
+            ),
+            InsertOne(new_document_record)
+        ], ordered=True)
+        return {"status": "success", "message": f"Verified data for {payload.filename} saved."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save data to MongoDB: {str(e)}")
 
-@app.get("/get-report-data/")
-async def get_report_data():
+@app.post("/save-verified-documents-bulk/")
+async def save_verified_documents_bulk(payloads: List[VerificationPayload]):
+    """Save a batch of verified documents in one MongoDB bulk_write.
+
+    N documents through the single-document endpoint cost 2N round-trips to
+    Atlas; here the deactivation updates and the inserts are interleaved into
+    a single ordered command.
+    """
+    if not payloads:
+        return {"status": "success", "message": "No documents to save."}
     try:
-        cursor = verified_collection.find({"is_active": True})
-        documents = await cursor.to_list(length=None)
-        for doc in documents:
-            doc["_id"] = str(doc["_id"])
-        return documents
+        now = datetime.now(timezone.utc)
+        operations = []
+        for payload in payloads:
+            operations.append(UpdateMany(
+                {"application_id": payload.application_id, "filename": payload.filename, "is_active": True},
+                {"$set": {"is_active": False, "end_date": now}}
+            ))
+            operations.append(InsertOne({
+                "application_id": payload.application_id,
+                "filename": payload.filename,
+                "ai_data": payload.original_ai_data.get("extracted_data", {}),
+                "verified_data": payload.verified_data,
+                "start_date": now,
+                "end_date": None,
+                "is_active": True
+            }))
+        result = await verified_collection.bulk_write(operations, ordered=True)
+        return {"status": "success", "message": f"Saved {result.inserted_count} verified documents."}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch report data: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to save data to MongoDB: {str(e)}")
+
+@app.get("/get-report-data/")
+async def get_report_data():
+    """Stream the active verified documents as newline-delimited JSON.
+
+    to_list(length=None) used to materialize the whole collection in RAM and
+    then rewrite every _id; now the cursor is iterated asynchronously and each
+    document is encoded and flushed as it arrives, so memory stays constant no
+    matter how large the history grows. The projection trims each record to
+    the fields the dashboard actually renders (_id was only ever stringified
+    and dropped client-side).
+    """
+    cursor = verified_collection.find(
+        {"is_active": True},
+        projection={"_id": 0, "application_id": 1, "filename": 1,
+                    "ai_data": 1, "verified_data": 1, "is_active": 1}
+    ).sort("start_date", -1)
+
+    async def ndjson_stream():
+        async for doc in cursor:
+            yield orjson.dumps(doc) + b"\n"
+
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
 
 @app.delete("/delete-all-data/")
 async def delete_all_data():